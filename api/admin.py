@@ -1,3 +1,199 @@
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from .breed_verification import enqueue_breed_verification
+from .dispatch import cat_assignment_error, complete_mission_if_done, dispatch_next_mission
+from .models import Cat, Mission, MissionWaitlistEntry, Target
+from .validators import validate_cat_breed
 
-# Register your models here.
+# Below this many rows an exact COUNT(*) is cheap enough
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses PostgreSQL's planner estimate instead of COUNT(*) for unfiltered
+    changelists of large tables; everything else gets an exact count.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                    [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] > ESTIMATED_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
+
+
+def target_count_subquery(**filters):
+    """
+    Correlated COUNT of a mission's targets. Unlike a JOIN + GROUP BY over
+    the whole table, it is only evaluated for the rows on the current page.
+    """
+    targets = (Target.objects.filter(mission=OuterRef('pk'), **filters)
+               .order_by().values('mission').annotate(count=Count('pk')).values('count'))
+    return Coalesce(Subquery(targets, output_field=IntegerField()), 0)
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Skips the second, unfiltered COUNT(*) shown next to filtered results
+    show_full_result_count = False
+    list_per_page = 50
+    # Autocomplete pages through get_queryset() too, so it needs a stable order
+    ordering = ['-pk']
+
+
+class CatAdminForm(forms.ModelForm):
+    def clean_breed(self):
+        breed = self.cleaned_data['breed']
+        # In deferred mode the breed is checked later by the verify_breeds worker
+        if 'breed' in self.changed_data and not settings.DEFER_BREED_VERIFICATION:
+            try:
+                validate_cat_breed(breed)
+            except serializers.ValidationError as error:
+                raise forms.ValidationError(error.detail)
+        return breed
+
+
+@admin.register(Cat)
+class CatAdmin(ScalableModelAdmin):
+    form = CatAdminForm
+    list_display = ['id', 'name', 'breed', 'breed_status',
+                    'years_of_experience', 'salary', 'is_available']
+    list_filter = ['breed_status']
+    search_fields = ['name', 'breed']
+    readonly_fields = ['breed_status']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_active_mission()
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        # The mission form's cat autocomplete only offers cats that can take a mission
+        if request.GET.get('model_name') == 'mission' and request.GET.get('field_name') == 'cat':
+            queryset = queryset.filter(
+                active_mission_id__isnull=True, breed_status=Cat.BreedStatus.VERIFIED)
+        return queryset, may_have_duplicates
+
+    def save_model(self, request, obj, form, change):
+        breed_changed = 'breed' in form.changed_data
+        if breed_changed:
+            obj.breed_status = (Cat.BreedStatus.PENDING if settings.DEFER_BREED_VERIFICATION
+                                else Cat.BreedStatus.VERIFIED)
+        super().save_model(request, obj, form, change)
+        if breed_changed and settings.DEFER_BREED_VERIFICATION:
+            enqueue_breed_verification(obj)
+        if not change:
+            dispatch_next_mission(obj)
+
+    @admin.display(boolean=True, description='Available')
+    def is_available(self, cat):
+        return cat.is_available
+
+
+class TargetAdminForm(forms.ModelForm):
+    """Completed targets are shown read-only, as the API refuses to change them."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Notes default to empty, as in the API
+        self.fields['notes'].required = False
+        if self.instance.pk is not None and self.instance.is_complete:
+            for field in self.fields.values():
+                field.disabled = True
+
+    @property
+    def completes_target(self):
+        return 'is_complete' in self.changed_data and self.instance.is_complete
+
+
+class TargetInline(admin.TabularInline):
+    model = Target
+    form = TargetAdminForm
+    extra = 0
+    min_num = 1
+    max_num = 3
+    validate_min = True
+
+
+class MissionAdminForm(forms.ModelForm):
+    def clean_cat(self):
+        cat = self.cleaned_data['cat']
+        if 'cat' in self.changed_data:
+            mission = self.instance if self.instance.pk is not None else None
+            error = cat_assignment_error(mission, cat)
+            if error is not None:
+                raise forms.ValidationError(error)
+        return cat
+
+
+@admin.register(Mission)
+class MissionAdmin(ScalableModelAdmin):
+    form = MissionAdminForm
+    list_display = ['id', 'cat', 'is_complete', 'completed_at',
+                    'target_count', 'completed_target_count']
+    list_select_related = ['cat']
+    list_filter = ['is_complete']
+    search_fields = ['=id', 'cat__name']
+    autocomplete_fields = ['cat']
+    readonly_fields = ['completed_at']
+    inlines = [TargetInline]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            target_count=target_count_subquery(),
+            completed_target_count=target_count_subquery(is_complete=True),
+        )
+
+    def get_readonly_fields(self, request, obj=None):
+        # Existing missions complete through their targets, like in the API
+        if obj is not None:
+            return [*self.readonly_fields, 'is_complete']
+        return self.readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if 'cat' in form.changed_data and obj.cat is not None:
+            MissionWaitlistEntry.objects.filter(mission=obj).delete()
+
+    def save_formset(self, request, form, formset, change):
+        super().save_formset(request, form, formset, change)
+        if any(target_form.completes_target for target_form in formset.forms
+               if target_form not in formset.deleted_forms):
+            complete_mission_if_done(form.instance)
+
+    @admin.display(ordering='target_count', description='Targets')
+    def target_count(self, mission):
+        return mission.target_count
+
+    @admin.display(ordering='completed_target_count', description='Completed targets')
+    def completed_target_count(self, mission):
+        return mission.completed_target_count
+
+
+@admin.register(Target)
+class TargetAdmin(ScalableModelAdmin):
+    form = TargetAdminForm
+    list_display = ['id', 'name', 'country', 'mission', 'is_complete']
+    list_select_related = ['mission']
+    list_filter = ['is_complete']
+    search_fields = ['name', 'country']
+    autocomplete_fields = ['mission']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if form.completes_target:
+            complete_mission_if_done(obj.mission)
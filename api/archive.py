@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import ArchivedMission, ArchivedTarget, Mission, Target
+
+
+def archivable_missions(older_than=None):
+    """Completed missions whose completion is older than `older_than`."""
+    if older_than is None:
+        older_than = settings.MISSION_ARCHIVE_AFTER
+    cutoff = timezone.now() - older_than
+    return Mission.objects.filter(is_complete=True, completed_at__lt=cutoff)
+
+
+@transaction.atomic
+def archive_mission_chunk(mission_ids):
+    """Moves the given missions and their targets into the archive tables."""
+    missions = list(Mission.objects.select_for_update().filter(
+        pk__in=mission_ids, is_complete=True))
+    if not missions:
+        return 0
+    targets = Target.objects.filter(mission__in=missions)
+
+    ArchivedMission.objects.bulk_create([
+        ArchivedMission(id=mission.pk, cat_id=mission.cat_id,
+                        completed_at=mission.completed_at)
+        for mission in missions
+    ])
+    ArchivedTarget.objects.bulk_create([
+        ArchivedTarget(id=target.pk, mission_id=target.mission_id, name=target.name,
+                       country=target.country, notes=target.notes,
+                       is_complete=target.is_complete)
+        for target in targets
+    ])
+    Mission.objects.filter(pk__in=[mission.pk for mission in missions]).delete()
+    return len(missions)
+
+
+def archive_completed_missions(older_than=None, chunk_size=None):
+    """
+    Archives every eligible mission, one transaction per chunk so that
+    locks stay short. Returns the number of archived missions.
+    """
+    if chunk_size is None:
+        chunk_size = settings.MISSION_ARCHIVE_CHUNK_SIZE
+    queryset = archivable_missions(older_than).order_by('pk')
+    archived = 0
+    last_pk = 0
+    while True:
+        mission_ids = list(queryset.filter(pk__gt=last_pk).values_list(
+            'pk', flat=True)[:chunk_size])
+        if not mission_ids:
+            return archived
+        archived += archive_mission_chunk(mission_ids)
+        last_pk = mission_ids[-1]
@@ -0,0 +1,137 @@
+"""
+In-process execution of `/api/batch` sub-requests.
+
+Each sub-request is resolved against the URLconf and handed straight to
+its view, skipping the middleware stack the outer request already went
+through. Paths and bodies may reference earlier results with
+`{{N.body.field}}` (N is the zero-based index of an earlier sub-request,
+list items are addressed by index, e.g. `{{0.body.targets.1.id}}`).
+"""
+import io
+import json
+import logging
+import re
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+REFERENCE = re.compile(r'\{\{\s*(\d+)((?:\.[\w-]+)+)\s*\}\}')
+BATCH_PATH_PREFIX = '/api/'
+
+
+class BatchReferenceError(Exception):
+    pass
+
+
+class BatchAborted(Exception):
+    pass
+
+
+def lookup_reference(responses, index, path):
+    index = int(index)
+    if index >= len(responses):
+        raise BatchReferenceError(f"Reference to sub-request {index} which has not run yet")
+    value = responses[index]
+    for key in path.strip('.').split('.'):
+        try:
+            value = value[int(key)] if isinstance(value, list) else value[key]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise BatchReferenceError(f"Unresolvable reference {{{{{index}{path}}}}}")
+    return value
+
+
+def resolve_references(value, responses):
+    """Substitutes references in strings, recursing into lists and dicts."""
+    if isinstance(value, dict):
+        return {key: resolve_references(item, responses) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(item, responses) for item in value]
+    if not isinstance(value, str):
+        return value
+
+    whole = REFERENCE.fullmatch(value)
+    if whole:
+        # A bare reference keeps the referenced value's type (e.g. an integer id)
+        return lookup_reference(responses, *whole.groups())
+    return REFERENCE.sub(
+        lambda match: str(lookup_reference(responses, *match.groups())), value)
+
+
+def build_subrequest(request, method, path, body):
+    """Builds a Django request for a sub-request, inheriting the outer request's META."""
+    url = urlsplit(path)
+    payload = b'' if body is None else json.dumps(body, cls=DjangoJSONEncoder).encode()
+    environ = {
+        **request.META,
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': io.BytesIO(payload),
+    }
+    subrequest = WSGIRequest(environ)
+    if hasattr(request, 'user'):
+        subrequest.user = request.user
+    # The outer batch request has already passed CSRF validation
+    subrequest._dont_enforce_csrf_checks = True
+    return subrequest
+
+
+def error_result(status_code, detail):
+    return {'status': status_code, 'body': {'detail': detail}}
+
+
+def execute_subrequest(request, item, responses, batch_url_name):
+    try:
+        path = resolve_references(item['path'], responses)
+        body = resolve_references(item.get('body'), responses)
+    except BatchReferenceError as error:
+        return error_result(400, str(error))
+
+    if not path.startswith(BATCH_PATH_PREFIX):
+        return error_result(400, f"Only {BATCH_PATH_PREFIX} routes can be batched")
+    try:
+        match = resolve(urlsplit(path).path)
+    except Resolver404:
+        return error_result(404, f"No route for {path}")
+    if match.url_name == batch_url_name:
+        return error_result(400, "Batch requests cannot be nested")
+
+    subrequest = build_subrequest(request, item['method'], path, body)
+    subrequest.resolver_match = match
+    try:
+        response = match.func(subrequest, *match.args, **match.kwargs)
+    except Exception:
+        # Keep the other results; atomic batches are rolled back on the 500
+        logger.exception("Batch sub-request %s %s failed", item['method'], path)
+        return error_result(500, "Internal server error")
+    if hasattr(response, 'data'):
+        response_body = response.data
+    else:
+        response_body = response.content.decode() or None
+    return {'status': response.status_code, 'body': response_body}
+
+
+def execute_batch(request, items, atomic=False, batch_url_name='batch'):
+    """
+    Runs the sub-requests in order and returns (responses, rolled_back).
+    In atomic mode everything runs in one transaction that is rolled back,
+    and execution stopped, at the first sub-request answering with >= 400.
+    """
+    responses = []
+    try:
+        with transaction.atomic() if atomic else nullcontext():
+            for item in items:
+                result = execute_subrequest(request, item, responses, batch_url_name)
+                responses.append(result)
+                if atomic and result['status'] >= 400:
+                    raise BatchAborted
+    except BatchAborted:
+        return responses, True
+    return responses, False
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .dispatch import dispatch_next_mission
+from .models import BreedVerificationJob, Cat
+from .validators import fetch_breed_catalog
+
+
+def enqueue_breed_verification(cat):
+    """Marks the cat's breed as pending and (re)schedules its verification."""
+    if cat.breed_status != Cat.BreedStatus.PENDING:
+        cat.breed_status = Cat.BreedStatus.PENDING
+        cat.save(update_fields=['breed_status'])
+    BreedVerificationJob.objects.update_or_create(
+        cat=cat, defaults={'attempts': 0, 'run_after': timezone.now(), 'last_error': ''})
+
+
+def retry_delay(attempts):
+    """Exponential backoff, capped at BREED_VERIFICATION_RETRY_MAX."""
+    delay = settings.BREED_VERIFICATION_RETRY_BASE * 2 ** (attempts - 1)
+    return min(delay, settings.BREED_VERIFICATION_RETRY_MAX)
+
+
+def due_jobs():
+    return BreedVerificationJob.objects.filter(run_after__lte=timezone.now())
+
+
+def postpone_jobs(jobs, error):
+    now = timezone.now()
+    for job in jobs:
+        job.attempts += 1
+        job.run_after = now + retry_delay(job.attempts)
+        job.last_error = str(error)
+    BreedVerificationJob.objects.bulk_update(jobs, ['attempts', 'run_after', 'last_error'])
+
+
+def process_breed_verifications(batch_size=None, fetch_catalog=fetch_breed_catalog):
+    """
+    Verifies one batch of due jobs against a single catalog fetch.
+
+    Returns the number of verified, rejected and postponed cats. If the
+    catalog cannot be fetched the whole batch is retried later with backoff.
+    """
+    import requests
+
+    if batch_size is None:
+        batch_size = settings.BREED_VERIFICATION_BATCH_SIZE
+    result = {'verified': 0, 'rejected': 0, 'postponed': 0}
+    if not due_jobs().exists():
+        return result
+
+    try:
+        catalog = fetch_catalog()
+        fetch_error = None
+    except (requests.RequestException, ValueError) as error:
+        catalog = None
+        fetch_error = error
+
+    with transaction.atomic():
+        jobs = list(due_jobs().select_for_update(skip_locked=True, of=('self',))
+                    .select_related('cat').order_by('run_after')[:batch_size])
+        if fetch_error is not None:
+            postpone_jobs(jobs, fetch_error)
+            result['postponed'] = len(jobs)
+            return result
+
+        verified_ids = [job.cat_id for job in jobs if job.cat.breed.lower() in catalog]
+        rejected_ids = [job.cat_id for job in jobs if job.cat.breed.lower() not in catalog]
+        Cat.objects.filter(pk__in=verified_ids).update(breed_status=Cat.BreedStatus.VERIFIED)
+        Cat.objects.filter(pk__in=rejected_ids).update(breed_status=Cat.BreedStatus.REJECTED)
+        BreedVerificationJob.objects.filter(pk__in=[job.pk for job in jobs]).delete()
+
+        # Newly verified cats are free to take waiting missions
+        for job in jobs:
+            if job.cat_id in verified_ids:
+                job.cat.breed_status = Cat.BreedStatus.VERIFIED
+                dispatch_next_mission(job.cat)
+
+    result['verified'] = len(verified_ids)
+    result['rejected'] = len(rejected_ids)
+    return result
@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, IntegerField, Q, Sum, Value
+from django.db.models.functions import Round
+from django.db.models.lookups import GreaterThan, LessThan
+from rest_framework.exceptions import ValidationError
+from .models import Cat
+
+SALARY_OUTPUT = DecimalField(max_digits=10, decimal_places=2)
+
+
+def cat_filter_q(filters):
+    """Translates validated `CatFilterSerializer` data into a Q object."""
+    filters = filters or {}
+    lookups = {
+        'ids': 'pk__in',
+        'breed': 'breed__iexact',
+        'min_years_of_experience': 'years_of_experience__gte',
+        'max_years_of_experience': 'years_of_experience__lte',
+        'min_salary': 'salary__gte',
+        'max_salary': 'salary__lte',
+    }
+    return Q(**{lookups[key]: value for key, value in filters.items()})
+
+
+def adjusted_expression(field_name, adjustment, output_field):
+    """Builds the SQL expression computing the new value of `field_name`."""
+    if 'set' in adjustment:
+        expression = Value(adjustment['set'])
+    elif 'add' in adjustment:
+        expression = F(field_name) + Value(adjustment['add'])
+    else:
+        expression = F(field_name) * Value(adjustment['multiply'])
+
+    if isinstance(output_field, DecimalField):
+        return Round(expression, output_field.decimal_places, output_field=output_field)
+    return expression
+
+
+def adjust_cats(bounds, filters=None, salary=None, years_of_experience=None, dry_run=False):
+    """
+    Applies salary/experience adjustments to every matching cat in a single
+    UPDATE. `bounds` maps each field to its (min, max); if any matching cat
+    would end up outside them nothing is updated and a ValidationError is
+    raised. With `dry_run` only the counts and totals are computed, including
+    how many cats would leave the range.
+    """
+    updates = {}
+    if salary is not None:
+        updates['salary'] = adjusted_expression('salary', salary, SALARY_OUTPUT)
+    if years_of_experience is not None:
+        updates['years_of_experience'] = adjusted_expression(
+            'years_of_experience', years_of_experience, IntegerField())
+
+    out_of_bounds = Q()
+    for field_name, expression in updates.items():
+        min_value, max_value = bounds[field_name]
+        out_of_bounds |= Q(LessThan(expression, min_value)) | Q(GreaterThan(expression, max_value))
+
+    queryset = Cat.objects.filter(cat_filter_q(filters))
+    with transaction.atomic():
+        summary = queryset.aggregate(
+            matched=Count('pk'),
+            out_of_bounds=Count('pk', filter=out_of_bounds),
+            total_salary_before=Sum('salary'),
+            total_salary_after=Sum(updates.get('salary', F('salary'))),
+        )
+        summary['dry_run'] = dry_run
+        if dry_run:
+            summary['updated'] = 0
+            return summary
+        if summary['out_of_bounds']:
+            raise ValidationError(
+                {"detail": f"Adjustment would move {summary['out_of_bounds']} cat(s) "
+                           f"outside the allowed salary or experience range"})
+
+        # The bounds are re-checked in the UPDATE itself. If rows changed since the
+        # aggregate, the counts differ and raising rolls back the partial update.
+        summary['updated'] = queryset.exclude(out_of_bounds).update(**updates)
+        if summary['updated'] != summary['matched']:
+            raise ValidationError(
+                {"detail": "Matching cats changed during the adjustment; nothing was updated, "
+                           "please retry"})
+
+    return summary
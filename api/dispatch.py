@@ -0,0 +1,110 @@
+from django.db import transaction
+from django.db.models import Q
+from .models import Cat, Mission, MissionWaitlistEntry
+
+
+def waiting_entries():
+    """
+    Entries whose mission is still open and unassigned, in dispatch order.
+    Entries of missions assigned by other means (admin, plain save) are skipped.
+    """
+    return (MissionWaitlistEntry.objects
+            .filter(mission__cat__isnull=True, mission__is_complete=False)
+            .order_by('-priority', 'enqueued_at'))
+
+
+def eligible_entries(cat):
+    """Waiting missions whose requirements the cat meets, in dispatch order."""
+    return (waiting_entries()
+            .filter(Q(breed='') | Q(breed__iexact=cat.breed),
+                    min_years_of_experience__lte=cat.years_of_experience))
+
+
+def eligible_cats(entry):
+    """Free, verified cats meeting the entry's requirements."""
+    cats = (Cat.objects.with_active_mission()
+            .filter(active_mission_id__isnull=True,
+                    breed_status=Cat.BreedStatus.VERIFIED,
+                    years_of_experience__gte=entry.min_years_of_experience)
+            .order_by('pk'))
+    if entry.breed:
+        cats = cats.filter(breed__iexact=entry.breed)
+    return cats
+
+
+def cat_assignment_error(mission, cat):
+    """
+    Returns why `cat` cannot be given `mission` (None for a new mission),
+    or None if the assignment is allowed.
+    """
+    if mission is not None and mission.cat is not None:
+        return "Cannot reassign mission: current spy cat is deployed"
+    if cat is not None and cat.breed_status != Cat.BreedStatus.VERIFIED:
+        return "Cannot assign mission to cat whose breed is not verified"
+    if cat is not None and not cat.is_available:
+        return "Cannot assign mission to cat currently in the field"
+    return None
+
+
+def assign(entry, cat):
+    """
+    Gives the entry's mission to the cat unless it was assigned or completed
+    meanwhile. The entry is consumed either way; returns whether it took.
+    """
+    assigned = Mission.objects.filter(
+        pk=entry.mission_id, cat__isnull=True, is_complete=False).update(cat=cat)
+    entry.delete()
+    return assigned == 1
+
+
+@transaction.atomic
+def dispatch_next_mission(cat):
+    """
+    Assigns the freed cat to the highest-priority waiting mission it is
+    eligible for. Meant to run in the transaction that completes the cat's
+    previous mission. Returns the assigned mission or None.
+    """
+    if cat.breed_status != Cat.BreedStatus.VERIFIED:
+        return None
+    while True:
+        entry = (eligible_entries(cat).select_for_update(skip_locked=True, of=('self',))
+                 .select_related('mission').first())
+        if entry is None:
+            return None
+        if assign(entry, cat):
+            entry.mission.cat = cat
+            return entry.mission
+
+
+@transaction.atomic
+def complete_mission_if_done(mission):
+    """
+    Completes the mission once none of its targets is left open and hands
+    its freed cat the next waiting mission. Returns whether it completed.
+    """
+    if mission.is_complete or mission.targets.filter(is_complete=False).exists():
+        return False
+    mission.is_complete = True
+    mission.save()
+    if mission.cat is not None:
+        dispatch_next_mission(mission.cat)
+    return True
+
+
+@transaction.atomic
+def enqueue_mission(mission, priority=0, min_years_of_experience=0, breed=""):
+    """
+    Puts an unassigned mission on the waitlist, or assigns it straight away
+    if a suitable cat is already free. Returns the waitlist entry, or None
+    if the mission was assigned.
+    """
+    entry, _ = MissionWaitlistEntry.objects.update_or_create(
+        mission=mission,
+        defaults={'priority': priority,
+                  'min_years_of_experience': min_years_of_experience,
+                  'breed': breed})
+    cat = eligible_cats(entry).select_for_update(skip_locked=True, of=('self',)).first()
+    if cat is None:
+        return entry
+    assign(entry, cat)
+    return None
@@ -0,0 +1,38 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.archive import archivable_missions, archive_completed_missions
+
+
+class Command(BaseCommand):
+    help = "Moves completed missions older than the archive age into the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days", type=float,
+            default=settings.MISSION_ARCHIVE_AFTER.total_seconds() / 86400,
+            help="Archive missions completed more than this many days ago.")
+        parser.add_argument(
+            "--chunk-size", type=int, default=settings.MISSION_ARCHIVE_CHUNK_SIZE,
+            help="Number of missions moved per transaction.")
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only report how many missions would be archived.")
+        parser.add_argument(
+            "--every", type=int, metavar="SECONDS",
+            help="Keep running and archive again every SECONDS seconds.")
+
+    def handle(self, *args, **options):
+        older_than = timedelta(days=options["older_than_days"])
+        while True:
+            if options["dry_run"]:
+                count = archivable_missions(older_than).count()
+                self.stdout.write(f"{count} mission(s) would be archived.")
+            else:
+                count = archive_completed_missions(older_than, options["chunk_size"])
+                self.stdout.write(self.style.SUCCESS(f"Archived {count} mission(s)."))
+
+            if not options["every"]:
+                return
+            time.sleep(options["every"])
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models import RequestProfile
+from api.profiling import diff_stats, format_stats, load_stats, make_profile_token
+
+
+class Command(BaseCommand):
+    help = "Lists, shows, diffs and exports captured request profiles."
+
+    def add_arguments(self, parser):
+        subcommands = parser.add_subparsers(dest="subcommand", required=True)
+
+        list_parser = subcommands.add_parser("list", help="List the most recent profiles.")
+        list_parser.add_argument("--limit", type=int, default=20)
+        list_parser.add_argument("--path", help="Only profiles whose path contains this text.")
+
+        show_parser = subcommands.add_parser("show", help="Print the top functions and SQL of a profile.")
+        show_parser.add_argument("profile_id", type=int)
+        show_parser.add_argument("--sort", default="cumulative")
+        show_parser.add_argument("--limit", type=int, default=30)
+
+        diff_parser = subcommands.add_parser(
+            "diff", help="Compare cumulative time per function between two profiles.")
+        diff_parser.add_argument("old_id", type=int)
+        diff_parser.add_argument("new_id", type=int)
+        diff_parser.add_argument("--limit", type=int, default=30)
+
+        dump_parser = subcommands.add_parser(
+            "dump", help="Write a profile as a .pstats file for snakeviz and friends.")
+        dump_parser.add_argument("profile_id", type=int)
+        dump_parser.add_argument("file")
+
+        subcommands.add_parser("token", help="Print a signed X-Profile-Token header value.")
+
+    def handle(self, *args, **options):
+        getattr(self, f"handle_{options['subcommand']}")(options)
+
+    def get_profile(self, profile_id):
+        try:
+            return RequestProfile.objects.get(pk=profile_id)
+        except RequestProfile.DoesNotExist:
+            raise CommandError(f"Profile {profile_id} does not exist")
+
+    def handle_list(self, options):
+        profiles = RequestProfile.objects.defer("stats_data").order_by("-created_at", "-pk")
+        if options["path"]:
+            profiles = profiles.filter(path__contains=options["path"])
+        for profile in profiles[:options["limit"]]:
+            self.stdout.write(
+                f"{profile.pk:>6}  {profile.created_at:%Y-%m-%d %H:%M:%S}  "
+                f"{profile.status_code}  {profile.duration_ms:>9.1f} ms  "
+                f"{len(profile.sql_queries):>3} queries  {profile.method} {profile.path}")
+
+    def handle_show(self, options):
+        profile = self.get_profile(options["profile_id"])
+        self.stdout.write(str(profile))
+        self.stdout.write(format_stats(profile, options["sort"], options["limit"]))
+        for query in profile.sql_queries:
+            self.stdout.write(f"{query['duration_ms']:>9.3f} ms  {query['sql']}")
+
+    def handle_diff(self, options):
+        old = self.get_profile(options["old_id"])
+        new = self.get_profile(options["new_id"])
+        self.stdout.write(f"old: {old}\nnew: {new}")
+        self.stdout.write(
+            f"SQL: {len(old.sql_queries)} -> {len(new.sql_queries)} queries")
+        self.stdout.write(f"{'old ms':>10}{'new ms':>10}{'delta':>10}  function")
+        for func, old_ms, new_ms in diff_stats(old, new, options["limit"]):
+            self.stdout.write(f"{old_ms:>10.2f}{new_ms:>10.2f}{new_ms - old_ms:>+10.2f}  {func}")
+
+    def handle_dump(self, options):
+        load_stats(self.get_profile(options["profile_id"])).dump_stats(options["file"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['file']}"))
+
+    def handle_token(self, options):
+        self.stdout.write(make_profile_token())
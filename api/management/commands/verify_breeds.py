@@ -0,0 +1,32 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.breed_verification import process_breed_verifications
+
+
+class Command(BaseCommand):
+    help = "Background worker that verifies pending cat breeds in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.BREED_VERIFICATION_BATCH_SIZE,
+            help="Number of pending cats checked per catalog fetch.")
+        parser.add_argument(
+            "--poll-interval", type=float, default=5,
+            help="Seconds to wait when the queue has no due jobs.")
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Process a single batch and exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            result = process_breed_verifications(options["batch_size"])
+            if any(result.values()):
+                self.stdout.write(
+                    f"verified={result['verified']} rejected={result['rejected']} "
+                    f"postponed={result['postponed']}")
+
+            if options["once"]:
+                return
+            if not result['verified'] and not result['rejected']:
+                time.sleep(options["poll_interval"])
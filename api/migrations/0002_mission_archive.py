@@ -0,0 +1,51 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_completed_at(apps, schema_editor):
+    # The real completion time of existing missions is unknown, so start
+    # their archive age from the moment this migration runs.
+    Mission = apps.get_model('api', 'Mission')
+    Mission.objects.filter(is_complete=True, completed_at__isnull=True).update(
+        completed_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mission',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['is_complete', 'completed_at'], name='api_mission_is_comp_28937d_idx'),
+        ),
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='ArchivedMission',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('cat', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_missions', to='api.cat')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedTarget',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('country', models.CharField(max_length=100)),
+                ('notes', models.TextField(default='')),
+                ('is_complete', models.BooleanField(default=True)),
+                ('mission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='targets', to='api.archivedmission')),
+            ],
+        ),
+    ]
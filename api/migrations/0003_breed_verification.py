@@ -0,0 +1,28 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_mission_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cat',
+            name='breed_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('verified', 'Verified'), ('rejected', 'Rejected')], default='verified', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='BreedVerificationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('run_after', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('last_error', models.TextField(default='')),
+                ('cat', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='breed_verification_job', to='api.cat')),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0 on 2026-10-19 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_breed_verification'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cat',
+            name='breed_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('verified', 'Verified'), ('rejected', 'Rejected')], db_index=True, default='verified', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='target',
+            index=models.Index(fields=['is_complete', 'mission'], name='api_target_is_comp_5b98dc_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-19 09:09
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_request_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MissionWaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('priority', models.PositiveSmallIntegerField(default=0)),
+                ('min_years_of_experience', models.PositiveIntegerField(default=0)),
+                ('breed', models.CharField(blank=True, default='', max_length=100)),
+                ('enqueued_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('mission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entry', to='api.mission')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-priority', 'enqueued_at'], name='api_mission_priorit_af8498_idx')],
+            },
+        ),
+    ]
@@ -1,25 +1,49 @@
 from django.db import models
+from django.db.models import OuterRef, Subquery
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
-from drf_spectacular.utils import extend_schema_field
-from rest_framework.fields import BooleanField
+
+
+class CatQuerySet(models.QuerySet):
+    def with_active_mission(self):
+        """Annotates each cat with the id of its incomplete mission, if any."""
+        active_missions = Mission.objects.filter(
+            cat=OuterRef('pk'), is_complete=False).values('pk')[:1]
+        return self.annotate(active_mission_id=Subquery(active_missions))
 
 
 class Cat(models.Model):
+    class BreedStatus(models.TextChoices):
+        PENDING = 'pending'
+        VERIFIED = 'verified'
+        REJECTED = 'rejected'
+
     name = models.CharField(max_length=100)
     years_of_experience = models.PositiveIntegerField()
     breed = models.CharField(max_length=100)
+    breed_status = models.CharField(
+        max_length=10, choices=BreedStatus.choices, default=BreedStatus.VERIFIED,
+        db_index=True)
     salary = models.DecimalField(max_digits=10, decimal_places=2, validators=[
                                  MinValueValidator(Decimal('0.00'))])
 
+    objects = CatQuerySet.as_manager()
+
     @property
     def current_mission(self):
         return self.missions.filter(is_complete=False).first()
 
     @property
-    @extend_schema_field(BooleanField)
+    def current_mission_id(self):
+        if hasattr(self, 'active_mission_id'):
+            return self.active_mission_id
+        current_mission = self.current_mission
+        return current_mission.pk if current_mission else None
+
+    @property
     def is_available(self):
-        return self.current_mission is None
+        return self.current_mission_id is None
 
     def __str__(self):
         return f"ID {self.pk}: {self.name} ({self.breed}, {self.years_of_experience} yrs, ${self.salary})"
@@ -30,6 +54,24 @@ class Mission(models.Model):
         Cat, on_delete=models.SET_NULL, null=True, blank=True, related_name='missions'
     )
     is_complete = models.BooleanField(default=False)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_complete', 'completed_at']),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Archiving keys off completed_at, so stamp it however the mission gets completed
+        if self.is_complete and self.completed_at is None:
+            self.completed_at = timezone.now()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'completed_at'}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Mission {self.pk} ({'complete' if self.is_complete else 'active'})"
 
 
 class Target(models.Model):
@@ -39,3 +81,79 @@ class Target(models.Model):
     country = models.CharField(max_length=100)
     notes = models.TextField(default="")
     is_complete = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_complete', 'mission']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.country})"
+
+
+class MissionWaitlistEntry(models.Model):
+    """
+    An unassigned mission waiting for a suitable cat. The dispatcher hands
+    it to the first freed cat meeting the requirements, highest priority
+    first and oldest first within a priority.
+    """
+    mission = models.OneToOneField(
+        Mission, on_delete=models.CASCADE, related_name='waitlist_entry')
+    priority = models.PositiveSmallIntegerField(default=0)
+    min_years_of_experience = models.PositiveIntegerField(default=0)
+    breed = models.CharField(max_length=100, blank=True, default="")
+    enqueued_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-priority', 'enqueued_at']),
+        ]
+
+
+class BreedVerificationJob(models.Model):
+    """Queue entry for a cat whose breed still has to be checked against TheCatAPI."""
+    cat = models.OneToOneField(
+        Cat, on_delete=models.CASCADE, related_name='breed_verification_job')
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now, db_index=True)
+    last_error = models.TextField(default="")
+
+
+class ArchivedMission(models.Model):
+    """
+    Cold copy of a completed mission. Keeps the original primary key so
+    archived missions stay reachable under their old id.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    cat = models.ForeignKey(
+        Cat, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_missions'
+    )
+    completed_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    is_complete = True
+
+
+class ArchivedTarget(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    mission = models.ForeignKey(
+        ArchivedMission, on_delete=models.CASCADE, related_name='targets')
+    name = models.CharField(max_length=100)
+    country = models.CharField(max_length=100)
+    notes = models.TextField(default="")
+    is_complete = models.BooleanField(default=True)
+
+
+class RequestProfile(models.Model):
+    """A request captured by `api.profiling.RequestProfilingMiddleware`."""
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2000)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    # marshal-encoded pstats data, as written by pstats.Stats.dump_stats
+    stats_data = models.BinaryField()
+    sql_queries = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"ID {self.pk}: {self.method} {self.path} ({self.duration_ms:.1f} ms)"
@@ -0,0 +1,135 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it carries a valid signed `X-Profile-Token`
+header (see `manage.py profiles token`) or is picked by
+`REQUEST_PROFILING_SAMPLE_RATE`. Profiled requests run under cProfile and
+the pstats data plus every SQL statement with its timing is stored as a
+`RequestProfile`. With sampling at 0 and the header disabled the
+middleware removes itself from the stack.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import time
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from .models import RequestProfile
+
+TOKEN_HEADER = 'X-Profile-Token'
+TOKEN_SALT = 'api.profiling'
+EXCLUDED_PATH_PREFIX = '/api/profiles/'
+
+
+def make_profile_token():
+    return signing.dumps('profile', salt=TOKEN_SALT)
+
+
+def is_valid_profile_token(token):
+    try:
+        signing.loads(token, salt=TOKEN_SALT,
+                      max_age=settings.REQUEST_PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class QueryRecorder:
+    """Database execute wrapper collecting each statement and its duration."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+class RequestProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_PROFILING_SAMPLE_RATE
+        self.header_enabled = settings.REQUEST_PROFILING_HEADER_ENABLED
+        if not self.sample_rate and not self.header_enabled:
+            raise MiddlewareNotUsed
+
+    def should_profile(self, request):
+        if request.path.startswith(EXCLUDED_PATH_PREFIX):
+            return False
+        if self.header_enabled:
+            token = request.headers.get(TOKEN_HEADER)
+            if token is not None and is_valid_profile_token(token):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = profiler.runcall(self.get_response, request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        self.store(request, response, profiler, recorder.queries, duration_ms)
+        return response
+
+    def store(self, request, response, profiler, queries, duration_ms):
+        profiler.create_stats()
+        RequestProfile.objects.create(
+            method=request.method,
+            path=request.get_full_path()[:2000],
+            status_code=response.status_code,
+            duration_ms=duration_ms,
+            stats_data=marshal.dumps(profiler.stats),
+            sql_queries=queries,
+        )
+        stale = RequestProfile.objects.order_by('-created_at', '-pk').values_list(
+            'pk', flat=True)[settings.REQUEST_PROFILING_MAX_STORED:]
+        RequestProfile.objects.filter(pk__in=list(stale)).delete()
+
+
+def load_stats(profile, stream=None):
+    stats = pstats.Stats(stream=stream)
+    stats.stats = marshal.loads(bytes(profile.stats_data))
+    stats.get_top_level_stats()
+    return stats
+
+
+def format_stats(profile, sort_by='cumulative', limit=30):
+    """Renders the top functions of a profile like `pstats.Stats.print_stats`."""
+    stream = io.StringIO()
+    load_stats(profile, stream).sort_stats(sort_by).print_stats(limit)
+    return stream.getvalue()
+
+
+def diff_stats(old_profile, new_profile, limit=30):
+    """
+    Per-function change in cumulative time (ms) between two profiles, largest
+    absolute change first. Functions missing from one side count as 0.
+    """
+    def cumulative_ms(profile):
+        return {
+            pstats.func_std_string(func): timing[3] * 1000
+            for func, timing in load_stats(profile).stats.items()
+        }
+
+    old, new = cumulative_ms(old_profile), cumulative_ms(new_profile)
+    rows = [
+        (func, old.get(func, 0.0), new.get(func, 0.0))
+        for func in old.keys() | new.keys()
+    ]
+    rows.sort(key=lambda row: abs(row[2] - row[1]), reverse=True)
+    return rows[:limit]
@@ -0,0 +1,32 @@
+"""
+OpenAPI annotations that only import drf-spectacular when it is installed.
+
+Profiles without schema tooling (see `core/settings_production.py`) get
+no-op decorators, so the schema stack is never loaded at startup.
+"""
+from django.conf import settings
+
+SCHEMA_ENABLED = 'drf_spectacular' in settings.INSTALLED_APPS
+
+if SCHEMA_ENABLED:
+    from drf_spectacular.utils import (
+        OpenApiParameter, extend_schema, extend_schema_serializer, extend_schema_view)
+else:
+    def _noop_decorator(*args, **kwargs):
+        return lambda obj: obj
+
+    extend_schema = extend_schema_serializer = extend_schema_view = _noop_decorator
+
+
+def query_list_parameters(fields, expandable=()):
+    """Documents the `fields`/`expand` query parameters of sparse fieldset views."""
+    if not SCHEMA_ENABLED:
+        return []
+    parameters = [OpenApiParameter(
+        'fields', str,
+        description=f"Comma-separated subset of fields to return: {', '.join(fields)}.")]
+    if expandable:
+        parameters.append(OpenApiParameter(
+            'expand', str,
+            description=f"Comma-separated relations to inline: {', '.join(expandable)}."))
+    return parameters
@@ -1,29 +1,105 @@
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from django.conf import settings
 from django.db import transaction
-from .models import Cat, Mission, Target
+from .dispatch import cat_assignment_error, complete_mission_if_done, dispatch_next_mission
+from .models import (
+    ArchivedMission, ArchivedTarget, Cat, Mission, MissionWaitlistEntry, RequestProfile, Target)
+from .profiling import format_stats
+from .breed_verification import enqueue_breed_verification
 from .validators import validate_cat_breed
-from drf_spectacular.utils import extend_schema_field, extend_schema_serializer, extend_schema
-from rest_framework.fields import IntegerField
 
 
-class CatSerializer(serializers.ModelSerializer):
-    current_mission_id = serializers.SerializerMethodField()
+def parse_query_list(request, param):
+    """
+    Returns the comma-separated values of a query parameter as a set.
+    None means the parameter was not given (or the request is a write).
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    raw_value = request.query_params.get(param)
+    if raw_value is None:
+        return None
+    return {value.strip() for value in raw_value.split(',') if value.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Prunes the output to the `?fields=` whitelist and swaps relations listed
+    in `expandable_fields` for nested representations on `?expand=`.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if fields is None:
+            fields = parse_query_list(request, 'fields')
+            self.check_query_list('fields', fields, self.fields)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+        expand = parse_query_list(request, 'expand')
+        self.check_query_list('expand', expand, self.expandable_fields)
+        for field_name in expand or ():
+            if field_name in self.fields:
+                serializer_class, serializer_kwargs = self.expandable_fields[field_name]
+                self.fields[field_name] = serializer_class(**serializer_kwargs)
+
+    @staticmethod
+    def check_query_list(param, values, allowed):
+        """Rejects an empty list or unknown names, so a typo is not mistaken for missing data."""
+        if values is None:
+            return
+        if not values:
+            raise serializers.ValidationError({param: ["Expected at least one field name."]})
+        unknown = values - set(allowed)
+        if unknown:
+            raise serializers.ValidationError({param: [
+                f"Unknown field(s): {', '.join(sorted(unknown))}. "
+                f"Allowed: {', '.join(allowed) or 'none'}."]})
+
+
+class CatSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    is_available = serializers.BooleanField(read_only=True)
+    current_mission_id = serializers.IntegerField(read_only=True, allow_null=True)
     salary = serializers.FloatField(min_value=0, max_value=1000000)
     years_of_experience = serializers.IntegerField(min_value=0, max_value=20)
 
     class Meta:
         model = Cat
-        fields = ['id', 'name', 'years_of_experience', 'breed',
+        fields = ['id', 'name', 'years_of_experience', 'breed', 'breed_status',
                   'salary', 'is_available', 'current_mission_id']
-        read_only_fields = ['id', 'is_available']
+        read_only_fields = ['id', 'breed_status', 'is_available']
 
     def validate_breed(self, breed_value):
-        validate_cat_breed(breed_value)
+        # In deferred mode the breed is checked later by the verify_breeds worker
+        if not settings.DEFER_BREED_VERIFICATION:
+            validate_cat_breed(breed_value)
         return breed_value
 
-    @extend_schema_field(IntegerField)
-    def get_current_mission_id(self, cat_instance):
-        return cat_instance.current_mission.pk if cat_instance.current_mission else None
+    @transaction.atomic
+    def create(self, validated_data):
+        if settings.DEFER_BREED_VERIFICATION:
+            validated_data['breed_status'] = Cat.BreedStatus.PENDING
+        cat = super().create(validated_data)
+        if settings.DEFER_BREED_VERIFICATION:
+            enqueue_breed_verification(cat)
+        # A new cat with a verified breed can take a waiting mission right away
+        dispatch_next_mission(cat)
+        return cat
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        breed_changed = 'breed' in validated_data and validated_data['breed'] != instance.breed
+        if breed_changed:
+            validated_data['breed_status'] = (Cat.BreedStatus.PENDING if settings.DEFER_BREED_VERIFICATION
+                                              else Cat.BreedStatus.VERIFIED)
+        cat = super().update(instance, validated_data)
+        if breed_changed and settings.DEFER_BREED_VERIFICATION:
+            enqueue_breed_verification(cat)
+        return cat
 
 
 class TargetSerializer(serializers.ModelSerializer):
@@ -40,31 +116,31 @@ class TargetSerializer(serializers.ModelSerializer):
     @transaction.atomic
     def update(self, instance: Target, validated_data):
         instance = super().update(instance, validated_data)
-        mission = instance.mission
-        if not mission.targets.filter(is_complete=False):
-            mission.is_complete = True
-            mission.save()
-
+        # Hands the freed cat its next waiting mission in the same transaction
+        complete_mission_if_done(instance.mission)
         return instance
 
 
-class MissionSerializer(serializers.ModelSerializer):
+class MissionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     targets = TargetSerializer(many=True)
 
+    # Only columns fetched by the cat join, so expansion costs no extra queries
+    expandable_fields = {
+        'cat': (CatSerializer, {
+            'fields': ['id', 'name', 'years_of_experience', 'breed', 'breed_status', 'salary'],
+            'read_only': True,
+        }),
+    }
+
     class Meta:
         model = Mission
-        fields = ['id', 'cat', 'is_complete', 'targets']
-        read_only_fields = ['id']
+        fields = ['id', 'cat', 'is_complete', 'completed_at', 'targets']
+        read_only_fields = ['id', 'completed_at']
 
     def validate_cat(self, cat):
-        if self.instance is not None:
-            if self.instance.cat is not None:
-                raise serializers.ValidationError(
-                    "Cannot reassign mission: current spy cat is deployed")
-        
-        if cat is not None and cat.is_available == False:
-            raise serializers.ValidationError(
-                "Cannot assign mission to cat currently in the field")
+        error = cat_assignment_error(self.instance, cat)
+        if error is not None:
+            raise serializers.ValidationError(error)
         return cat
 
     def validate_targets(self, targets):
@@ -74,6 +150,7 @@ class MissionSerializer(serializers.ModelSerializer):
                 "Mission must have between 1 and 3 targets.")
         return targets
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         # Cleaning up data that shouldn't be modifiable
         IMMUTABLE_FIELDS = ["is_complete", "targets"]
@@ -81,6 +158,8 @@ class MissionSerializer(serializers.ModelSerializer):
             if field in validated_data:
                 del validated_data[field]
 
+        if validated_data.get('cat') is not None:
+            MissionWaitlistEntry.objects.filter(mission=instance).delete()
         return super().update(instance, validated_data)
 
     @transaction.atomic
@@ -93,3 +172,155 @@ class MissionSerializer(serializers.ModelSerializer):
         ])
 
         return mission
+
+
+class MissionWaitlistEntrySerializer(serializers.ModelSerializer):
+    min_years_of_experience = serializers.IntegerField(
+        min_value=0, max_value=20, required=False)
+
+    class Meta:
+        model = MissionWaitlistEntry
+        fields = ['id', 'mission', 'priority', 'min_years_of_experience',
+                  'breed', 'enqueued_at']
+        read_only_fields = ['id', 'mission', 'enqueued_at']
+
+    def validate(self, data):
+        mission = self.context['mission']
+        if mission.is_complete:
+            raise serializers.ValidationError(
+                "Cannot queue a completed mission")
+        if mission.cat is not None:
+            raise serializers.ValidationError(
+                "Cannot queue mission: a spy cat is already assigned")
+        return data
+
+
+class ArchivedTargetSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedTarget
+        fields = ['id', 'name', 'country', 'notes', 'is_complete']
+        read_only_fields = fields
+
+
+class ArchivedMissionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Read-only mirror of `MissionSerializer` for missions moved to the archive."""
+    is_complete = serializers.BooleanField(read_only=True)
+    targets = ArchivedTargetSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedMission
+        fields = ['id', 'cat', 'is_complete', 'completed_at', 'archived_at', 'targets']
+        read_only_fields = fields
+
+
+class AdjustmentMixin:
+    """Requires exactly one operation per adjusted field."""
+
+    def validate(self, data):
+        if len(data) != 1:
+            raise serializers.ValidationError(
+                f"Specify exactly one of: {', '.join(self.fields)}.")
+        return data
+
+
+class SalaryAdjustmentSerializer(AdjustmentMixin, serializers.Serializer):
+    set = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    add = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    multiply = serializers.DecimalField(
+        max_digits=8, decimal_places=4, min_value=0, required=False)
+
+
+class ExperienceAdjustmentSerializer(AdjustmentMixin, serializers.Serializer):
+    set = serializers.IntegerField(required=False)
+    add = serializers.IntegerField(required=False)
+
+
+class CatFilterSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    breed = serializers.CharField(max_length=100, required=False)
+    min_years_of_experience = serializers.IntegerField(required=False)
+    max_years_of_experience = serializers.IntegerField(required=False)
+    min_salary = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    max_salary = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+
+
+class CatBulkAdjustSerializer(serializers.Serializer):
+    filter = CatFilterSerializer(required=False)
+    salary = SalaryAdjustmentSerializer(required=False)
+    years_of_experience = ExperienceAdjustmentSerializer(required=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if 'salary' not in data and 'years_of_experience' not in data:
+            raise serializers.ValidationError(
+                "Specify a salary and/or years_of_experience adjustment.")
+        return data
+
+    @staticmethod
+    def bounds():
+        """The same ranges `CatSerializer` enforces on single-cat writes."""
+        fields = CatSerializer._declared_fields
+        return {
+            field_name: (fields[field_name].min_value, fields[field_name].max_value)
+            for field_name in ('salary', 'years_of_experience')
+        }
+
+
+class CatBulkAdjustResultSerializer(serializers.Serializer):
+    matched = serializers.IntegerField()
+    out_of_bounds = serializers.IntegerField()
+    updated = serializers.IntegerField()
+    total_salary_before = serializers.FloatField(allow_null=True)
+    total_salary_after = serializers.FloatField(allow_null=True)
+    dry_run = serializers.BooleanField()
+
+
+class RequestProfileSerializer(serializers.ModelSerializer):
+    query_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RequestProfile
+        fields = ['id', 'method', 'path', 'status_code', 'duration_ms',
+                  'query_count', 'created_at']
+        read_only_fields = fields
+
+    def get_query_count(self, profile) -> int:
+        return len(profile.sql_queries)
+
+
+class RequestProfileDetailSerializer(RequestProfileSerializer):
+    top_functions = serializers.SerializerMethodField()
+
+    class Meta(RequestProfileSerializer.Meta):
+        fields = RequestProfileSerializer.Meta.fields + ['sql_queries', 'top_functions']
+        read_only_fields = fields
+
+    def get_top_functions(self, profile) -> str:
+        return format_stats(profile)
+
+
+class BatchItemSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    path = serializers.CharField(max_length=2000)
+    body = serializers.JSONField(required=False, allow_null=True)
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+    atomic = serializers.BooleanField(default=False)
+
+    def validate_requests(self, requests):
+        if len(requests) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f"A batch can contain at most {settings.BATCH_MAX_REQUESTS} requests.")
+        return requests
+
+
+class BatchResultItemSerializer(serializers.Serializer):
+    status = serializers.IntegerField()
+    body = serializers.JSONField(allow_null=True)
+
+
+class BatchResultSerializer(serializers.Serializer):
+    rolled_back = serializers.BooleanField()
+    responses = BatchResultItemSerializer(many=True)
@@ -1,7 +1,27 @@
+import os
+import subprocess
+import sys
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 from rest_framework.test import APITestCase
 from rest_framework import status
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from .models import Cat, Mission, Target
+from django.utils import timezone
+import requests
+from .archive import archive_completed_missions
+from .breed_verification import process_breed_verifications
+from .models import (
+    ArchivedMission, ArchivedTarget, BreedVerificationJob, Cat, Mission, MissionWaitlistEntry,
+    RequestProfile, Target)
+from .profiling import make_profile_token
 
 
 class CatTests(APITestCase):
@@ -380,3 +400,739 @@ class MissionTest(APITestCase):
         self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
         first_target.refresh_from_db()
         self.assertTrue(first_target.is_complete)
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.cat = Cat.objects.create(
+            name="Pipa", breed="Persian", years_of_experience=3, salary=100)
+        self.mission = Mission.objects.create(cat=self.cat)
+        Target.objects.create(
+            mission=self.mission, name="Target 1", country="Catoria")
+        Target.objects.create(
+            mission=self.mission, name="Target 2", country="Moldova")
+
+    def test_cat_fields_prune_output(self):
+        response = self.client.get(
+            reverse("cat-list"), {"fields": "id,name,is_available"})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(
+            [{"id": self.cat.pk, "name": "Pipa", "is_available": False}],
+            response.json())
+
+    def test_cat_fields_without_availability_skip_mission_lookup(self):
+        Cat.objects.create(
+            name="Biba", breed="Abyssinian", years_of_experience=4, salary=144)
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse("cat-list"), {"fields": "id,name"})
+        self.assertEqual({"id", "name"}, set(response.json()[0]))
+
+    def test_cat_list_resolves_current_mission_in_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("cat-list"))
+        self.assertEqual(self.mission.pk, response.json()[0]["current_mission_id"])
+
+    def test_mission_fields_without_targets_skip_prefetch(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse("mission-list"), {"fields": "id,is_complete"})
+        self.assertEqual(
+            [{"id": self.mission.pk, "is_complete": False}], response.json())
+
+    def test_mission_expand_cat_inline(self):
+        detail_url = reverse("mission-detail", kwargs={"pk": self.mission.pk})
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                detail_url, {"fields": "id,cat", "expand": "cat"})
+        self.assertEqual(self.cat.pk, response.json()["cat"]["id"])
+        self.assertEqual("Pipa", response.json()["cat"]["name"])
+
+    def test_unknown_or_empty_fields_are_rejected(self):
+        for params in ({"fields": "id,nmae"}, {"fields": ""}, {"expand": "targets"}):
+            response = self.client.get(reverse("mission-list"), params)
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+            self.assertIn(next(iter(params)), response.json())
+        response = self.client.get(reverse("cat-list"), {"fields": "id,salery"})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertIn("salery", response.json()["fields"][0])
+
+    def test_fields_param_ignored_on_write(self):
+        patch_url = reverse("mission-detail", kwargs={"pk": Mission.objects.create().pk})
+        response = self.client.patch(
+            patch_url + "?fields=id", {"cat": None}, format="json")
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertIn("targets", response.json())
+
+
+class MissionArchiveTests(APITestCase):
+    def setUp(self):
+        self.cat = Cat.objects.create(
+            name="Pipa", breed="Persian", years_of_experience=3, salary=100)
+        self.old_mission = Mission.objects.create(
+            cat=self.cat, is_complete=True,
+            completed_at=timezone.now() - timedelta(days=90))
+        self.old_target = Target.objects.create(
+            mission=self.old_mission, name="Target 1", country="Catoria",
+            notes="Done long ago", is_complete=True)
+        self.recent_mission = Mission.objects.create(
+            cat=self.cat, is_complete=True, completed_at=timezone.now())
+        Target.objects.create(
+            mission=self.recent_mission, name="Target 2", country="Moldova",
+            is_complete=True)
+        self.active_mission = Mission.objects.create()
+        Target.objects.create(
+            mission=self.active_mission, name="Target 3", country="Romania")
+
+    def test_archives_only_old_completed_missions(self):
+        archived = archive_completed_missions(timedelta(days=30), chunk_size=1)
+        self.assertEqual(1, archived)
+        self.assertFalse(Mission.objects.filter(pk=self.old_mission.pk).exists())
+        self.assertFalse(Target.objects.filter(pk=self.old_target.pk).exists())
+        self.assertEqual(2, Mission.objects.count())
+
+        archived_target = ArchivedTarget.objects.get(pk=self.old_target.pk)
+        self.assertEqual(self.old_mission.pk, archived_target.mission.pk)
+        self.assertEqual("Done long ago", archived_target.notes)
+        self.assertEqual(self.cat, archived_target.mission.cat)
+
+    def test_archives_across_multiple_chunks(self):
+        for days in range(40, 45):
+            Mission.objects.create(
+                is_complete=True, completed_at=timezone.now() - timedelta(days=days))
+        archived = archive_completed_missions(timedelta(days=30), chunk_size=2)
+        self.assertEqual(6, archived)
+        self.assertEqual(6, ArchivedMission.objects.count())
+
+    def test_completing_last_target_sets_completed_at(self):
+        target = self.active_mission.targets.get()
+        patch_url = reverse("mission-target-detail",
+                            kwargs={'mission_pk': self.active_mission.pk, 'pk': target.pk})
+        self.client.patch(patch_url, {"is_complete": True}, format="json")
+        self.active_mission.refresh_from_db()
+        self.assertIsNotNone(self.active_mission.completed_at)
+
+    def test_mission_created_complete_gets_completed_at(self):
+        data = {
+            "is_complete": True,
+            "targets": [{"name": "Target Alpha", "country": "Germany"}],
+        }
+        response = self.client.post(reverse("mission-list"), data, format="json")
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertIsNotNone(response.json()["completed_at"])
+        mission = Mission.objects.get(pk=response.json()["id"])
+        self.assertIsNotNone(mission.completed_at)
+
+    def test_archived_mission_is_readable_through_detail_route(self):
+        archive_completed_missions(timedelta(days=30))
+        detail_url = reverse("mission-detail", kwargs={"pk": self.old_mission.pk})
+        response = self.client.get(detail_url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(self.old_mission.pk, response.json()["id"])
+        self.assertTrue(response.json()["is_complete"])
+        self.assertEqual(1, len(response.json()["targets"]))
+
+    def test_archive_listing_excludes_hot_missions(self):
+        archive_completed_missions(timedelta(days=30))
+        response = self.client.get(reverse("mission-archive"))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([self.old_mission.pk], [m["id"] for m in response.json()])
+        self.assertEqual(2, len(self.client.get(reverse("mission-list")).json()))
+
+    def test_archive_missions_command(self):
+        out = StringIO()
+        call_command("archive_missions", "--older-than-days=30", "--dry-run", stdout=out)
+        self.assertIn("1 mission(s) would be archived", out.getvalue())
+        self.assertEqual(0, ArchivedMission.objects.count())
+
+        call_command("archive_missions", "--older-than-days=30", stdout=out)
+        self.assertIn("Archived 1 mission(s)", out.getvalue())
+        self.assertEqual(1, ArchivedMission.objects.count())
+
+
+@override_settings(DEFER_BREED_VERIFICATION=True)
+class DeferredBreedVerificationTests(APITestCase):
+    def create_cat(self, breed):
+        data = {
+            "name": "Mushka",
+            "years_of_experience": 2,
+            "breed": breed,
+            "salary": 1000.00,
+        }
+        response = self.client.post(reverse("cat-list"), data, format="json")
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual("pending", response.json()["breed_status"])
+        return Cat.objects.get(pk=response.json()["id"])
+
+    def test_pending_cats_are_verified_in_one_catalog_fetch(self):
+        good_cat = self.create_cat("Persian")
+        bad_cat = self.create_cat("Ukrainian Unicorn")
+        fetches = []
+
+        def fetch_catalog():
+            fetches.append(1)
+            return {"persian", "ocicat"}
+
+        result = process_breed_verifications(fetch_catalog=fetch_catalog)
+        self.assertEqual({"verified": 1, "rejected": 1, "postponed": 0}, result)
+        self.assertEqual(1, len(fetches))
+        good_cat.refresh_from_db()
+        bad_cat.refresh_from_db()
+        self.assertEqual(Cat.BreedStatus.VERIFIED, good_cat.breed_status)
+        self.assertEqual(Cat.BreedStatus.REJECTED, bad_cat.breed_status)
+        self.assertFalse(BreedVerificationJob.objects.exists())
+
+    def test_upstream_failure_is_retried_with_backoff(self):
+        cat = self.create_cat("Persian")
+
+        def fetch_catalog():
+            raise requests.ConnectionError("TheCatAPI is down")
+
+        result = process_breed_verifications(fetch_catalog=fetch_catalog)
+        self.assertEqual(1, result["postponed"])
+        job = BreedVerificationJob.objects.get(cat=cat)
+        self.assertEqual(1, job.attempts)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn("TheCatAPI is down", job.last_error)
+
+        # Not due yet, so the next run does not even fetch the catalog
+        result = process_breed_verifications(fetch_catalog=fetch_catalog)
+        self.assertEqual({"verified": 0, "rejected": 0, "postponed": 0}, result)
+
+    def test_unexpected_catalog_format_is_retried_with_backoff(self):
+        cat = self.create_cat("Persian")
+        response = mock.Mock(json=mock.Mock(return_value={"message": "rate limited"}))
+        with mock.patch("requests.get", return_value=response):
+            result = process_breed_verifications()
+        self.assertEqual(1, result["postponed"])
+        self.assertIn("Unexpected breed catalog format",
+                      BreedVerificationJob.objects.get(cat=cat).last_error)
+
+    def test_new_cat_is_inserted_as_pending_in_one_write(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.create_cat("Persian")
+        cat_updates = [query["sql"] for query in queries.captured_queries
+                       if query["sql"].startswith('UPDATE "api_cat"')]
+        self.assertEqual([], cat_updates)
+
+    def test_breed_change_requeues_verification(self):
+        cat = Cat.objects.create(
+            name="Pipa", breed="Persian", years_of_experience=3, salary=100)
+        detail_url = reverse("cat-detail", kwargs={"pk": cat.pk})
+        self.client.patch(detail_url, {"breed": "Ocicat"}, format="json")
+        cat.refresh_from_db()
+        self.assertEqual(Cat.BreedStatus.PENDING, cat.breed_status)
+        self.assertTrue(BreedVerificationJob.objects.filter(cat=cat).exists())
+
+    def test_cannot_assign_mission_to_unverified_cat(self):
+        cat = self.create_cat("Persian")
+        data = {
+            "cat": cat.pk,
+            "targets": [{"name": "Target Alpha", "country": "Germany"}],
+        }
+        response = self.client.post(reverse("mission-list"), data, format="json")
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertIn("cat", response.json())
+
+
+class CatBulkAdjustTests(APITestCase):
+    def setUp(self):
+        self.veteran = Cat.objects.create(
+            name="Pipa", breed="Persian", years_of_experience=12, salary=1000)
+        self.rookie = Cat.objects.create(
+            name="Biba", breed="Abyssinian", years_of_experience=2, salary=500)
+        self.url = reverse("cat-bulk-adjust")
+
+    def test_raise_salary_for_experienced_cats_in_single_update(self):
+        data = {
+            "filter": {"min_years_of_experience": 10},
+            "salary": {"multiply": "1.05"},
+        }
+        with self.assertNumQueries(4):  # savepoint, aggregate, update, release
+            response = self.client.post(self.url, data, format="json")
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(1, response.json()["matched"])
+        self.assertEqual(1, response.json()["updated"])
+        self.veteran.refresh_from_db()
+        self.rookie.refresh_from_db()
+        self.assertEqual(1050, self.veteran.salary)
+        self.assertEqual(500, self.rookie.salary)
+
+    def test_dry_run_reports_totals_without_updating(self):
+        data = {
+            "filter": {"breed": "persian"},
+            "salary": {"add": "250"},
+            "years_of_experience": {"add": 1},
+            "dry_run": True,
+        }
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(
+            {"matched": 1, "out_of_bounds": 0, "updated": 0, "total_salary_before": 1000.0,
+             "total_salary_after": 1250.0, "dry_run": True},
+            response.json())
+        self.veteran.refresh_from_db()
+        self.assertEqual(1000, self.veteran.salary)
+
+    def test_adjustment_out_of_bounds_updates_nothing(self):
+        data = {"years_of_experience": {"add": 10}}
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.veteran.refresh_from_db()
+        self.rookie.refresh_from_db()
+        self.assertEqual(12, self.veteran.years_of_experience)
+        self.assertEqual(2, self.rookie.years_of_experience)
+
+    def test_dry_run_reports_out_of_bounds_cats(self):
+        data = {"years_of_experience": {"add": 10}, "dry_run": True}
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(2, response.json()["matched"])
+        self.assertEqual(1, response.json()["out_of_bounds"])
+        self.assertEqual(1500.0, response.json()["total_salary_after"])
+
+    def test_rows_changed_after_bounds_check_roll_back_whole_update(self):
+        original_update = QuerySet.update
+
+        def update_after_concurrent_write(queryset, **kwargs):
+            # Another transaction moves the veteran out of the filter in between
+            original_update(Cat.objects.filter(pk=self.veteran.pk), years_of_experience=9)
+            return original_update(queryset, **kwargs)
+
+        data = {"filter": {"min_years_of_experience": 10}, "salary": {"add": "100"}}
+        with mock.patch.object(QuerySet, "update", autospec=True,
+                               side_effect=update_after_concurrent_write):
+            response = self.client.post(self.url, data, format="json")
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.veteran.refresh_from_db()
+        self.assertEqual(12, self.veteran.years_of_experience)
+        self.assertEqual(1000, self.veteran.salary)
+
+    def test_adjustment_requires_single_operation(self):
+        data = {"salary": {"add": "10", "multiply": "2"}}
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertIn("salary", response.json())
+
+
+class AdminChangelistTests(APITestCase):
+    ROWS = 100_000
+
+    @classmethod
+    def setUpTestData(cls):
+        Cat.objects.bulk_create(
+            Cat(name=f"Cat {i}", breed="Persian", years_of_experience=i % 20, salary=100)
+            for i in range(cls.ROWS))
+        cats = list(Cat.objects.values_list("pk", flat=True)[:200])
+        missions = Mission.objects.bulk_create(
+            Mission(cat_id=cat_pk, is_complete=i % 2 == 0) for i, cat_pk in enumerate(cats))
+        Target.objects.bulk_create(
+            Target(mission=mission, name="Target", country="Catoria") for mission in missions)
+        cls.admin_user = get_user_model().objects.create_superuser(
+            "admin", "admin@example.com", "password")
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def test_cat_changelist_query_count_is_independent_of_rows(self):
+        # session, user, page count, page rows with availability subquery
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("admin:api_cat_changelist"))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertContains(response, f"Cat {self.ROWS - 1}")
+
+    def test_mission_changelist_avoids_per_row_lookups(self):
+        # session, user, page count, page rows with joined cat and target counts
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                reverse("admin:api_mission_changelist"), {"is_complete__exact": "0"})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    def test_mission_change_form_uses_cat_autocomplete(self):
+        mission = Mission.objects.first()
+        response = self.client.get(
+            reverse("admin:api_mission_change", args=[mission.pk]))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertContains(response, "admin-autocomplete")
+        self.assertNotContains(response, f": Cat {self.ROWS - 1} (")
+
+
+class AdminBusinessRuleTests(APITestCase):
+    def setUp(self):
+        self.admin_user = get_user_model().objects.create_superuser(
+            "admin", "admin@example.com", "password")
+        self.client.force_login(self.admin_user)
+        self.free_cat = Cat.objects.create(
+            name="Pipa", breed="Persian", years_of_experience=3, salary=100)
+        self.busy_cat = Cat.objects.create(
+            name="Biba", breed="Persian", years_of_experience=4, salary=144)
+        self.pending_cat = Cat.objects.create(
+            name="Mushka", breed="Persian", years_of_experience=2, salary=90,
+            breed_status=Cat.BreedStatus.PENDING)
+        self.mission = Mission.objects.create(cat=self.busy_cat)
+        self.done_target = Target.objects.create(
+            mission=self.mission, name="Target 1", country="Catoria", is_complete=True)
+        self.last_target = Target.objects.create(
+            mission=self.mission, name="Target 2", country="Moldova")
+
+    def mission_form_data(self, cat, targets=()):
+        data = {
+            "cat": cat.pk if cat else "",
+            "targets-TOTAL_FORMS": len(targets),
+            "targets-INITIAL_FORMS": sum(1 for target in targets if "id" in target),
+            "targets-MIN_NUM_FORMS": 1,
+            "targets-MAX_NUM_FORMS": 3,
+        }
+        for index, target in enumerate(targets):
+            for key, value in target.items():
+                data[f"targets-{index}-{key}"] = value
+        return data
+
+    def target_row(self, target, **changes):
+        row = {"id": target.pk, "mission": target.mission_id, "name": target.name,
+               "country": target.country, "notes": target.notes}
+        if target.is_complete:
+            row["is_complete"] = "on"
+        row.update(changes)
+        return row
+
+    def test_cat_autocomplete_for_missions_offers_only_assignable_cats(self):
+        response = self.client.get(reverse("admin:autocomplete"), {
+            "app_label": "api", "model_name": "mission", "field_name": "cat", "term": ""})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(
+            [str(self.free_cat.pk)], [result["id"] for result in response.json()["results"]])
+
+    def test_mission_form_refuses_busy_and_unverified_cats(self):
+        for cat in (self.busy_cat, self.pending_cat):
+            response = self.client.post(reverse("admin:api_mission_add"), self.mission_form_data(
+                cat, [{"name": "Target", "country": "Zambia"}]))
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertTrue(response.context["adminform"].form.errors["cat"])
+        self.assertEqual(1, Mission.objects.count())
+
+    @override_settings(DEFER_BREED_VERIFICATION=True)
+    def test_cat_breed_change_requeues_verification(self):
+        data = {"name": "Pipa", "breed": "Ocicat", "years_of_experience": 3, "salary": 100}
+        response = self.client.post(
+            reverse("admin:api_cat_change", args=[self.free_cat.pk]), data)
+        self.assertEqual(status.HTTP_302_FOUND, response.status_code)
+        self.free_cat.refresh_from_db()
+        self.assertEqual(Cat.BreedStatus.PENDING, self.free_cat.breed_status)
+        self.assertTrue(BreedVerificationJob.objects.filter(cat=self.free_cat).exists())
+
+    def test_completed_targets_are_read_only(self):
+        data = self.mission_form_data(self.busy_cat, [
+            self.target_row(self.done_target, notes="Rewritten", is_complete=""),
+            self.target_row(self.last_target)])
+        response = self.client.post(
+            reverse("admin:api_mission_change", args=[self.mission.pk]), data)
+        self.assertEqual(status.HTTP_302_FOUND, response.status_code)
+        self.done_target.refresh_from_db()
+        self.assertTrue(self.done_target.is_complete)
+        self.assertEqual("", self.done_target.notes)
+
+    def test_completing_last_target_inline_completes_mission_and_dispatches(self):
+        waiting = Mission.objects.create()
+        Target.objects.create(mission=waiting, name="Target", country="Zambia")
+        MissionWaitlistEntry.objects.create(mission=waiting)
+        data = self.mission_form_data(self.busy_cat, [
+            self.target_row(self.done_target),
+            self.target_row(self.last_target, is_complete="on")])
+        response = self.client.post(
+            reverse("admin:api_mission_change", args=[self.mission.pk]), data)
+        self.assertEqual(status.HTTP_302_FOUND, response.status_code)
+        self.mission.refresh_from_db()
+        waiting.refresh_from_db()
+        self.assertTrue(self.mission.is_complete)
+        self.assertIsNotNone(self.mission.completed_at)
+        self.assertEqual(self.busy_cat, waiting.cat)
+
+
+class MissionWaitlistTests(APITestCase):
+    def setUp(self):
+        self.cat = Cat.objects.create(
+            name="Pipa", breed="Persian", years_of_experience=5, salary=100)
+        self.current_mission = Mission.objects.create(cat=self.cat)
+        self.last_target = Target.objects.create(
+            mission=self.current_mission, name="Target 1", country="Catoria")
+
+    def create_waiting_mission(self, **requirements):
+        mission = Mission.objects.create()
+        Target.objects.create(mission=mission, name="Target", country="Moldova")
+        response = self.client.post(
+            reverse("mission-waitlist", kwargs={"pk": mission.pk}), requirements, format="json")
+        self.assertEqual(status.HTTP_202_ACCEPTED, response.status_code)
+        return mission
+
+    def complete_current_mission(self):
+        patch_url = reverse("mission-target-detail", kwargs={
+            "mission_pk": self.current_mission.pk, "pk": self.last_target.pk})
+        response = self.client.patch(patch_url, {"is_complete": True}, format="json")
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    def test_completing_mission_assigns_highest_priority_eligible_mission(self):
+        low = self.create_waiting_mission(priority=1)
+        high = self.create_waiting_mission(priority=5)
+        too_demanding = self.create_waiting_mission(priority=9, min_years_of_experience=10)
+        wrong_breed = self.create_waiting_mission(priority=9, breed="Ocicat")
+
+        self.complete_current_mission()
+
+        high.refresh_from_db()
+        self.assertEqual(self.cat, high.cat)
+        self.assertFalse(MissionWaitlistEntry.objects.filter(mission=high).exists())
+        for mission in (low, too_demanding, wrong_breed):
+            mission.refresh_from_db()
+            self.assertIsNone(mission.cat)
+
+    def test_dispatch_skips_missions_assigned_outside_the_waitlist(self):
+        assigned_elsewhere = self.create_waiting_mission(priority=9)
+        other_cat = Cat.objects.create(
+            name="Biba", breed="Abyssinian", years_of_experience=4, salary=144)
+        assigned_elsewhere.cat = other_cat
+        assigned_elsewhere.save()
+        still_waiting = self.create_waiting_mission(priority=1)
+
+        self.complete_current_mission()
+
+        assigned_elsewhere.refresh_from_db()
+        still_waiting.refresh_from_db()
+        self.assertEqual(other_cat, assigned_elsewhere.cat)
+        self.assertEqual(self.cat, still_waiting.cat)
+
+    def test_equal_priority_is_first_in_first_out(self):
+        first = self.create_waiting_mission(priority=2)
+        self.create_waiting_mission(priority=2)
+        self.complete_current_mission()
+        first.refresh_from_db()
+        self.assertEqual(self.cat, first.cat)
+
+    def test_queueing_assigns_immediately_when_cat_is_free(self):
+        free_cat = Cat.objects.create(
+            name="Biba", breed="Abyssinian", years_of_experience=4, salary=144)
+        mission = Mission.objects.create()
+        Target.objects.create(mission=mission, name="Target", country="Zambia")
+        response = self.client.post(
+            reverse("mission-waitlist", kwargs={"pk": mission.pk}),
+            {"breed": "abyssinian"}, format="json")
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(free_cat.pk, response.json()["cat"])
+        self.assertFalse(MissionWaitlistEntry.objects.exists())
+
+    @mock.patch("api.serializers.validate_cat_breed")
+    def test_creating_verified_cat_takes_waiting_mission(self, validate_cat_breed):
+        mission = self.create_waiting_mission(breed="Persian")
+        data = {"name": "Biba", "years_of_experience": 4, "breed": "Persian", "salary": 144}
+        response = self.client.post(reverse("cat-list"), data, format="json")
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        mission.refresh_from_db()
+        self.assertEqual(response.json()["id"], mission.cat_id)
+        self.assertFalse(MissionWaitlistEntry.objects.exists())
+
+    @override_settings(DEFER_BREED_VERIFICATION=True)
+    def test_breed_verification_dispatches_waiting_mission(self):
+        mission = self.create_waiting_mission()
+        data = {"name": "Biba", "years_of_experience": 4, "breed": "Persian", "salary": 144}
+        response = self.client.post(reverse("cat-list"), data, format="json")
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        mission.refresh_from_db()
+        self.assertIsNone(mission.cat)
+
+        process_breed_verifications(fetch_catalog=lambda: {"persian"})
+
+        mission.refresh_from_db()
+        self.assertEqual(response.json()["id"], mission.cat_id)
+        self.assertFalse(MissionWaitlistEntry.objects.exists())
+
+    def test_cannot_queue_assigned_mission(self):
+        response = self.client.post(
+            reverse("mission-waitlist", kwargs={"pk": self.current_mission.pk}), {}, format="json")
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_waitlist_is_listed_in_dispatch_order_and_can_be_left(self):
+        low = self.create_waiting_mission(priority=1)
+        high = self.create_waiting_mission(priority=3)
+        response = self.client.get(reverse("mission-waitlist-queue"))
+        self.assertEqual([high.pk, low.pk], [entry["mission"] for entry in response.json()])
+
+        response = self.client.delete(reverse("mission-waitlist", kwargs={"pk": high.pk}))
+        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+        self.assertFalse(MissionWaitlistEntry.objects.filter(mission=high).exists())
+
+
+class BatchRequestTests(APITestCase):
+    def setUp(self):
+        self.cat = Cat.objects.create(
+            name="Pipa", breed="Persian", years_of_experience=5, salary=100)
+        self.url = reverse("batch")
+
+    def create_mission_batch(self, atomic=False, notes="Found the fish"):
+        return {
+            "atomic": atomic,
+            "requests": [
+                {"method": "POST", "path": "/api/missions/", "body": {
+                    "cat": self.cat.pk,
+                    "targets": [
+                        {"name": "T1", "country": "Greece"},
+                        {"name": "T2", "country": "UK"},
+                    ],
+                }},
+                {"method": "PATCH",
+                 "path": "/api/missions/{{0.body.id}}/targets/{{0.body.targets.0.id}}",
+                 "body": {"notes": notes}},
+                {"method": "PATCH",
+                 "path": "/api/missions/{{0.body.id}}/targets/{{0.body.targets.1.id}}",
+                 "body": {"is_complete": True}},
+                {"method": "GET", "path": "/api/missions/{{0.body.id}}/"},
+            ],
+        }
+
+    def test_sequence_with_references_runs_in_one_round_trip(self):
+        response = self.client.post(self.url, self.create_mission_batch(), format="json")
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        body = response.json()
+        self.assertFalse(body["rolled_back"])
+        self.assertEqual([201, 200, 200, 200], [r["status"] for r in body["responses"]])
+        mission = body["responses"][3]["body"]
+        self.assertEqual("Found the fish", mission["targets"][0]["notes"])
+        self.assertTrue(mission["targets"][1]["is_complete"])
+
+    def test_atomic_batch_rolls_back_on_failure(self):
+        batch = self.create_mission_batch(atomic=True)
+        batch["requests"].insert(1, {"method": "GET", "path": "/api/cats/999/"})
+        response = self.client.post(self.url, batch, format="json")
+        self.assertTrue(response.json()["rolled_back"])
+        self.assertEqual([201, 404], [r["status"] for r in response.json()["responses"]])
+        self.assertFalse(Mission.objects.exists())
+
+    def test_non_atomic_batch_keeps_going_after_failure(self):
+        batch = {"requests": [
+            {"method": "GET", "path": "/api/cats/999/"},
+            {"method": "PATCH", "path": f"/api/cats/{self.cat.pk}/", "body": {"salary": 200}},
+        ]}
+        response = self.client.post(self.url, batch, format="json")
+        self.assertEqual([404, 200], [r["status"] for r in response.json()["responses"]])
+        self.cat.refresh_from_db()
+        self.assertEqual(200, self.cat.salary)
+
+    def test_rejects_unresolvable_reference_and_nested_batch(self):
+        batch = {"requests": [
+            {"method": "GET", "path": "/api/missions/{{3.body.id}}/"},
+            {"method": "POST", "path": "/api/batch", "body": {"requests": []}},
+        ]}
+        response = self.client.post(self.url, batch, format="json")
+        self.assertEqual([400, 400], [r["status"] for r in response.json()["responses"]])
+
+    def test_views_reading_resolver_match_work_in_batch(self):
+        batch = {"requests": [{"method": "GET", "path": "/api/"}]}
+        response = self.client.post(self.url, batch, format="json")
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        result = response.json()["responses"][0]
+        self.assertEqual(200, result["status"])
+        self.assertIn("cats", result["body"])
+
+    def test_unexpected_view_exception_is_reported_per_item(self):
+        batch = {"requests": [
+            {"method": "PATCH", "path": f"/api/cats/{self.cat.pk}/", "body": {"salary": 200}},
+            {"method": "GET", "path": "/api/cats/"},
+        ]}
+        with mock.patch("api.views.CatViewSet.list", side_effect=RuntimeError("boom")), \
+                self.assertLogs("api.batch", level="ERROR"):
+            response = self.client.post(self.url, batch, format="json")
+            self.assertEqual([200, 500], [r["status"] for r in response.json()["responses"]])
+            self.cat.refresh_from_db()
+            self.assertEqual(200, self.cat.salary)
+
+            batch["requests"][0]["body"] = {"salary": 300}
+            response = self.client.post(self.url, {**batch, "atomic": True}, format="json")
+        self.assertTrue(response.json()["rolled_back"])
+        self.cat.refresh_from_db()
+        self.assertEqual(200, self.cat.salary)
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_batch_size_is_limited(self):
+        response = self.client.post(self.url, self.create_mission_batch(), format="json")
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+
+class RequestProfilingTests(APITestCase):
+    def setUp(self):
+        self.cat = Cat.objects.create(
+            name="Pipa", breed="Persian", years_of_experience=3, salary=100)
+        self.staff_user = get_user_model().objects.create_user(
+            "staff", password="password", is_staff=True)
+
+    def profile_request(self):
+        return self.client.get(
+            reverse("cat-list"), headers={"X-Profile-Token": make_profile_token()})
+
+    def test_signed_header_captures_profile_and_sql(self):
+        response = self.profile_request()
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        profile = RequestProfile.objects.get()
+        self.assertEqual("/api/cats/", profile.path)
+        self.assertEqual(200, profile.status_code)
+        self.assertTrue(any("api_cat" in query["sql"] for query in profile.sql_queries))
+
+    def test_requests_are_not_profiled_by_default(self):
+        self.client.get(reverse("cat-list"))
+        self.client.get(reverse("cat-list"), headers={"X-Profile-Token": "forged"})
+        self.assertFalse(RequestProfile.objects.exists())
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=1.0)
+    def test_sampling_profiles_without_header(self):
+        self.client.get(reverse("cat-list"))
+        self.assertEqual(1, RequestProfile.objects.count())
+
+    def test_profiles_endpoint_is_staff_only(self):
+        self.profile_request()
+        profile = RequestProfile.objects.get()
+        detail_url = reverse("requestprofile-detail", kwargs={"pk": profile.pk})
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.client.get(detail_url).status_code)
+
+        self.client.force_login(self.staff_user)
+        response = self.client.get(detail_url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertIn("function calls", response.json()["top_functions"])
+        self.assertEqual(len(profile.sql_queries), response.json()["query_count"])
+
+    def test_profiles_command_lists_and_diffs(self):
+        self.profile_request()
+        self.profile_request()
+        old, new = RequestProfile.objects.order_by("pk")
+        out = StringIO()
+        call_command("profiles", "list", stdout=out)
+        self.assertIn("GET /api/cats/", out.getvalue())
+        call_command("profiles", "diff", str(old.pk), str(new.pk), stdout=out)
+        self.assertIn("SQL:", out.getvalue())
+
+
+class ProductionProfileTests(SimpleTestCase):
+    def test_production_profile_skips_schema_and_admin(self):
+        script = (
+            "import django, sys; django.setup(); "
+            "from django.urls import get_resolver; "
+            "print(sorted(str(p.pattern) for p in get_resolver().url_patterns)); "
+            "print('drf_spectacular' in sys.modules)"
+        )
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "core.settings_production",
+               "DJANGO_SECRET_KEY": "test", "DJANGO_ALLOWED_HOSTS": "api.example.com, "}
+        result = subprocess.run(
+            [sys.executable, "-c", script], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True, check=True)
+        routes, spectacular_loaded = result.stdout.strip().splitlines()
+        self.assertEqual("['', 'api/']", routes)
+        self.assertEqual("False", spectacular_loaded)
+
+    def test_production_profile_requires_allowed_hosts(self):
+        env = {key: value for key, value in os.environ.items() if key != "DJANGO_ALLOWED_HOSTS"}
+        env.update(DJANGO_SETTINGS_MODULE="core.settings_production", DJANGO_SECRET_KEY="test")
+        for allowed_hosts in (None, " , "):
+            if allowed_hosts is not None:
+                env["DJANGO_ALLOWED_HOSTS"] = allowed_hosts
+            result = subprocess.run(
+                [sys.executable, "-c", "import django; django.setup()"],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+            self.assertNotEqual(0, result.returncode)
+            self.assertIn("DJANGO_ALLOWED_HOSTS", result.stderr)
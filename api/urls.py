@@ -1,15 +1,17 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import CatViewSet, MissionViewSet, TargetViewSet
+from .views import BatchView, CatViewSet, MissionViewSet, RequestProfileViewSet, TargetViewSet
 
 router = DefaultRouter()
 router.register(r'cats', CatViewSet)
 router.register(r'missions', MissionViewSet)
+router.register(r'profiles', RequestProfileViewSet)
 
 embedded_routes = [
     path('missions/<int:mission_pk>/targets/<int:pk>',
          TargetViewSet.as_view({'patch': 'partial_update'}),
-         name='mission-target-detail')
+         name='mission-target-detail'),
+    path('batch', BatchView.as_view(), name='batch'),
 ]
 
 urlpatterns = router.urls + embedded_routes
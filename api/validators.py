@@ -1,17 +1,29 @@
-import requests
 from rest_framework.exceptions import ValidationError
 
 CAT_API_URL = "https://api.thecatapi.com/v1/breeds"
 
 
+def fetch_breed_catalog():
+    """Returns the lower-cased names of all breeds known to TheCatAPI."""
+    # Imported on first use: the HTTP client is a large share of cold start
+    import requests
+
+    response = requests.get(url=CAT_API_URL)
+    response.raise_for_status()
+    breeds_data = response.json()
+    try:
+        return {b['name'].lower() for b in breeds_data}
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Unexpected breed catalog format: {e!r}") from e
+
+
 def validate_cat_breed(breed_value):
+    import requests
+
     try:
-        response = requests.get(url=CAT_API_URL)
-        response.raise_for_status()
-        breeds_data = response.json()
-        valid_breeds = [b['name'].lower() for b in breeds_data]
+        valid_breeds = fetch_breed_catalog()
         if breed_value.lower() not in valid_breeds:
             raise ValidationError(f"Invalid breed: {breed_value}.")
-    except requests.RequestException as e:
+    except (requests.RequestException, ValueError) as e:
         raise ValidationError(
             f"Could not validate breed due to API error: {e}")
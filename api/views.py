@@ -1,16 +1,60 @@
-from rest_framework import viewsets
-from rest_framework.permissions import AllowAny
+from django.http import Http404
+from rest_framework import status, viewsets
+from rest_framework.views import APIView
+from rest_framework.generics import get_object_or_404
+from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.exceptions import ValidationError
-from .models import Cat, Mission, Target
-from .serializers import CatSerializer, MissionSerializer, TargetSerializer
-from drf_spectacular.utils import extend_schema_serializer, extend_schema
+from rest_framework.response import Response
+from .batch import execute_batch
+from .bulk_adjust import adjust_cats
+from .dispatch import enqueue_mission, waiting_entries
+from .models import ArchivedMission, Cat, Mission, MissionWaitlistEntry, RequestProfile, Target
+from .serializers import (
+    ArchivedMissionSerializer, BatchResultSerializer, BatchSerializer,
+    CatBulkAdjustResultSerializer, CatBulkAdjustSerializer,
+    CatSerializer, MissionSerializer, MissionWaitlistEntrySerializer,
+    RequestProfileDetailSerializer, RequestProfileSerializer, TargetSerializer,
+    parse_query_list)
+from .schema import (
+    extend_schema, extend_schema_serializer, extend_schema_view, query_list_parameters)
 
 
+CAT_READ_PARAMETERS = query_list_parameters(CatSerializer.Meta.fields)
+MISSION_READ_PARAMETERS = query_list_parameters(
+    MissionSerializer.Meta.fields, MissionSerializer.expandable_fields)
+
+
+@extend_schema_view(
+    list=extend_schema(parameters=CAT_READ_PARAMETERS),
+    retrieve=extend_schema(parameters=CAT_READ_PARAMETERS),
+)
 class CatViewSet(viewsets.ModelViewSet):
     queryset = Cat.objects.all()
     serializer_class = CatSerializer
     permission_classes = [AllowAny]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = parse_query_list(self.request, 'fields')
+        if fields is None or fields & {'is_available', 'current_mission_id'}:
+            queryset = queryset.with_active_mission()
+        return queryset
+
+    @extend_schema(request=CatBulkAdjustSerializer, responses=CatBulkAdjustResultSerializer)
+    @action(detail=False, methods=['post'], url_path='bulk-adjust',
+            serializer_class=CatBulkAdjustSerializer)
+    def bulk_adjust(self, request):
+        """Adjusts salary and/or experience of all matching cats in one UPDATE."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        options = dict(serializer.validated_data)
+        result = adjust_cats(
+            serializer.bounds(),
+            filters=options.pop('filter', None),
+            **options)
+        return Response(CatBulkAdjustResultSerializer(result).data)
+
 
 #Dirty hack for openapi generation hinting
 @extend_schema_serializer(exclude_fields=("is_complete", "targets"))
@@ -18,6 +62,10 @@ class MissionUpdateSchemaHack(MissionSerializer):
     pass
 
 
+@extend_schema_view(
+    list=extend_schema(parameters=MISSION_READ_PARAMETERS),
+    retrieve=extend_schema(parameters=MISSION_READ_PARAMETERS),
+)
 class MissionViewSet(viewsets.ModelViewSet):
     """
     Handles Mission CRUD and agency business logic for assignments and completion.
@@ -25,6 +73,82 @@ class MissionViewSet(viewsets.ModelViewSet):
     queryset = Mission.objects.all()
     serializer_class = MissionSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = parse_query_list(self.request, 'fields')
+        expand = parse_query_list(self.request, 'expand') or set()
+        if fields is None or 'targets' in fields:
+            queryset = queryset.prefetch_related('targets')
+        if 'cat' in expand and (fields is None or 'cat' in fields):
+            queryset = queryset.select_related('cat')
+        return queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        # Read-through: completed missions may have been moved to the archive
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            archived_mission = get_object_or_404(
+                ArchivedMission.objects.prefetch_related('targets'), pk=kwargs['pk'])
+            serializer = ArchivedMissionSerializer(
+                archived_mission, context=self.get_serializer_context())
+            return Response(serializer.data)
+
+    @extend_schema(
+        parameters=query_list_parameters(ArchivedMissionSerializer.Meta.fields),
+        responses=ArchivedMissionSerializer(many=True),
+    )
+    @action(detail=False, methods=['get'], url_path='archive',
+            serializer_class=ArchivedMissionSerializer)
+    def archive(self, request):
+        """Lists missions moved to the archive, most recently completed first."""
+        queryset = ArchivedMission.objects.order_by('-completed_at', '-pk')
+        fields = parse_query_list(request, 'fields')
+        if fields is None or 'targets' in fields:
+            queryset = queryset.prefetch_related('targets')
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(methods=['POST'], request=MissionWaitlistEntrySerializer,
+                   responses=MissionSerializer)
+    @action(detail=True, methods=['post', 'delete'],
+            serializer_class=MissionWaitlistEntrySerializer)
+    def waitlist(self, request, pk=None):
+        """
+        Queues an unassigned mission for the next suitable cat (202), or assigns
+        it right away if one is free (200). DELETE takes it off the waitlist.
+        """
+        mission = self.get_object()
+        if request.method == 'DELETE':
+            MissionWaitlistEntry.objects.filter(mission=mission).delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        serializer = MissionWaitlistEntrySerializer(
+            data=request.data, context={**self.get_serializer_context(), 'mission': mission})
+        serializer.is_valid(raise_exception=True)
+        entry = enqueue_mission(mission, **serializer.validated_data)
+        mission.refresh_from_db(fields=['cat'])
+        return Response(
+            MissionSerializer(mission, context=self.get_serializer_context()).data,
+            status=status.HTTP_202_ACCEPTED if entry is not None else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='waitlist', url_name='waitlist-queue',
+            serializer_class=MissionWaitlistEntrySerializer)
+    def waitlist_queue(self, request):
+        """Lists waiting missions in dispatch order."""
+        queryset = waiting_entries()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
     def perform_destroy(self, instance):
         if instance.cat is not None:
             raise ValidationError(
@@ -53,3 +177,39 @@ class TargetViewSet(viewsets.ModelViewSet):
         mission_id = self.kwargs["mission_pk"]
 
         return Target.objects.filter(mission_id=mission_id)
+
+
+class RequestProfileViewSet(viewsets.ReadOnlyModelViewSet):
+    """Profiles captured by the request profiling middleware (staff only)."""
+    queryset = RequestProfile.objects.order_by('-created_at', '-pk')
+    serializer_class = RequestProfileSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # The pstats blob is only needed on the detail view
+            queryset = queryset.defer('stats_data')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return RequestProfileDetailSerializer
+        return super().get_serializer_class()
+
+
+class BatchView(APIView):
+    """
+    Runs an ordered list of API sub-requests in one round trip. Later
+    sub-requests can reference earlier results, e.g. `{{0.body.id}}`; with
+    `atomic` the whole batch is rolled back at the first failing sub-request.
+    """
+
+    @extend_schema(request=BatchSerializer, responses=BatchResultSerializer)
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        responses, rolled_back = execute_batch(
+            request, serializer.validated_data['requests'],
+            atomic=serializer.validated_data['atomic'])
+        return Response({'rolled_back': rolled_back, 'responses': responses})
@@ -0,0 +1,93 @@
+"""
+Batch endpoint benchmark.
+
+Runs "create mission, then patch three targets" against a scratch SQLite
+database, once as four sequential requests and once as a single
+`/api/batch` call, through the full Django handler and middleware stack.
+`--rtt-ms` adds a simulated network round trip per HTTP request.
+
+Usage:
+    python benchmarks/batch.py [--iterations N] [--rtt-ms MS]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+TARGETS = [
+    {"name": "Eat all fish", "country": "Greece"},
+    {"name": "Drink all milk", "country": "UK"},
+    {"name": "Find the laser", "country": "Spain"},
+]
+
+
+def round_trip(client, rtt_ms, method, path, data=None):
+    time.sleep(rtt_ms / 1000)
+    response = getattr(client, method)(path, data, content_type="application/json")
+    assert response.status_code < 400, response.content
+    return response.json()
+
+
+def sequential(client, rtt_ms):
+    mission = round_trip(client, rtt_ms, "post", "/api/missions/", {"targets": TARGETS})
+    for target in mission["targets"]:
+        round_trip(client, rtt_ms, "patch",
+                   f"/api/missions/{mission['id']}/targets/{target['id']}",
+                   {"notes": "Done"})
+
+
+def batched(client, rtt_ms):
+    requests = [{"method": "POST", "path": "/api/missions/", "body": {"targets": TARGETS}}]
+    requests += [
+        {"method": "PATCH",
+         "path": f"/api/missions/{{{{0.body.id}}}}/targets/{{{{0.body.targets.{i}.id}}}}",
+         "body": {"notes": "Done"}}
+        for i in range(len(TARGETS))
+    ]
+    result = round_trip(client, rtt_ms, "post", "/api/batch",
+                        {"atomic": True, "requests": requests})
+    assert not result["rolled_back"], result
+
+
+def measure(sequence, client, iterations, rtt_ms):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        sequence(client, rtt_ms)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--rtt-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ['SQLITE_PATH'] = str(Path(tmp_dir) / 'bench.sqlite3')
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+        sys.path.insert(0, str(BASE_DIR))
+
+        import django
+        from django.core.management import call_command
+        from django.test import Client
+
+        django.setup()
+        call_command('migrate', verbosity=0)
+        client = Client(HTTP_HOST='localhost')
+
+        sequential_ms = measure(sequential, client, args.iterations, args.rtt_ms)
+        batched_ms = measure(batched, client, args.iterations, args.rtt_ms)
+        print(f"{'mode':<12}{'median ms':>12}")
+        print(f"{'sequential':<12}{sequential_ms:>12.2f}")
+        print(f"{'batch':<12}{batched_ms:>12.2f}")
+        print(f"speedup: {sequential_ms / batched_ms:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
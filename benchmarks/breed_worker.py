@@ -0,0 +1,71 @@
+"""
+Breed verification worker throughput benchmark.
+
+Queues N pending cats in a scratch SQLite database and drains the queue
+with `process_breed_verifications` for each batch size, using an in-memory
+catalog so only the worker's own database work is measured.
+
+Usage:
+    python benchmarks/breed_worker.py [--cats N] [--batch-sizes 10 100 500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CATALOG = {'persian', 'ocicat', 'abyssinian', 'toyger'}
+
+
+def queue_pending_cats(count):
+    from api.models import BreedVerificationJob, Cat
+
+    breeds = sorted(CATALOG) + ['ukrainian unicorn']
+    cats = Cat.objects.bulk_create([
+        Cat(name=f"Cat {i}", years_of_experience=i % 20, breed=breeds[i % len(breeds)],
+            salary=100, breed_status=Cat.BreedStatus.PENDING)
+        for i in range(count)
+    ])
+    BreedVerificationJob.objects.bulk_create([BreedVerificationJob(cat=cat) for cat in cats])
+
+
+def drain_queue(batch_size):
+    from api.breed_verification import process_breed_verifications
+
+    processed = 0
+    start = time.perf_counter()
+    while True:
+        result = process_breed_verifications(batch_size, fetch_catalog=lambda: CATALOG)
+        if not result['verified'] and not result['rejected']:
+            return processed, time.perf_counter() - start
+        processed += result['verified'] + result['rejected']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--cats', type=int, default=5000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[10, 100, 500])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ['SQLITE_PATH'] = str(Path(tmp_dir) / 'bench.sqlite3')
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+        sys.path.insert(0, str(BASE_DIR))
+
+        import django
+        from django.core.management import call_command
+
+        django.setup()
+        call_command('migrate', verbosity=0)
+
+        print(f"{'batch size':>10}{'cats':>8}{'seconds':>10}{'cats/s':>10}")
+        for batch_size in args.batch_sizes:
+            queue_pending_cats(args.cats)
+            processed, elapsed = drain_queue(batch_size)
+            print(f"{batch_size:>10}{processed:>8}{elapsed:>10.2f}{processed / elapsed:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
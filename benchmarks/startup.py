@@ -0,0 +1,100 @@
+"""
+Cold start benchmark.
+
+Starts fresh interpreters and measures, per settings profile:
+
+* import time   - interpreter start until `django.setup()` and the URLconf are loaded
+* first response - interpreter start until the WSGI app has answered GET /api/cats/
+
+Usage:
+    python benchmarks/startup.py [--runs N] [--settings core.settings core.settings_production]
+                                 [--max-first-response-ms MS]
+
+Exits non-zero when the median first response of any profile exceeds
+--max-first-response-ms, so it can gate CI against regressions.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Runs in the child interpreter; times are relative to interpreter start
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+imported = time.perf_counter()
+
+from core.wsgi import application
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': '/api/cats/', 'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+    'wsgi.url_scheme': 'http', 'wsgi.input': sys.stdin.buffer, 'wsgi.errors': sys.stderr,
+}
+statuses = []
+body = b''.join(application(environ, lambda status, headers: statuses.append(status)))
+responded = time.perf_counter()
+assert statuses[0].startswith('200'), statuses[0]
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_response_ms': (responded - start) * 1000,
+    'modules': len(sys.modules),
+}))
+"""
+
+
+def run_child(settings_module, db_path):
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': settings_module,
+        'DJANGO_SECRET_KEY': os.environ.get('DJANGO_SECRET_KEY', 'startup-benchmark'),
+        'DJANGO_ALLOWED_HOSTS': 'localhost',
+        'SQLITE_PATH': db_path,
+    }
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT], cwd=BASE_DIR, env=env,
+        stdin=subprocess.DEVNULL, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--settings', nargs='+',
+                        default=['core.settings', 'core.settings_production'])
+    parser.add_argument('--max-first-response-ms', type=float)
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = str(Path(tmp_dir) / 'bench.sqlite3')
+        subprocess.run(
+            [sys.executable, 'manage.py', 'migrate', '--verbosity', '0'],
+            cwd=BASE_DIR, env={**os.environ, 'SQLITE_PATH': db_path}, check=True)
+
+        print(f"{'settings':<28}{'import ms':>12}{'first response ms':>20}{'modules':>10}")
+        for settings_module in args.settings:
+            runs = [run_child(settings_module, db_path) for _ in range(args.runs)]
+            import_ms = statistics.median(run['import_ms'] for run in runs)
+            first_response_ms = statistics.median(run['first_response_ms'] for run in runs)
+            print(f"{settings_module:<28}{import_ms:>12.1f}{first_response_ms:>20.1f}"
+                  f"{runs[0]['modules']:>10}")
+            if args.max_first_response_ms and first_response_ms > args.max_first_response_ms:
+                failed = True
+
+    if failed:
+        print(f"First response slower than {args.max_first_response_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,6 +52,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.profiling.RequestProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -78,7 +81,7 @@ WSGI_APPLICATION = 'core.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
@@ -129,3 +132,25 @@ SPECTACULAR_SETTINGS = {
     "VERSION": "v1",
     "SERVE_INCLUDE_SCHEMA": DEBUG
 }
+
+# Completed missions older than this are moved to the archive tables
+# by `manage.py archive_missions`.
+MISSION_ARCHIVE_AFTER = timedelta(days=30)
+MISSION_ARCHIVE_CHUNK_SIZE = 500
+
+# When enabled, new cats are stored with a pending breed and verified in
+# batches by `manage.py verify_breeds` instead of during the request.
+DEFER_BREED_VERIFICATION = False
+BREED_VERIFICATION_BATCH_SIZE = 100
+BREED_VERIFICATION_RETRY_BASE = timedelta(seconds=30)
+BREED_VERIFICATION_RETRY_MAX = timedelta(hours=1)
+
+# Per-request profiling (api.profiling). Requests are profiled when sampled
+# or when they carry a token from `manage.py profiles token`.
+REQUEST_PROFILING_SAMPLE_RATE = 0.0
+REQUEST_PROFILING_HEADER_ENABLED = True
+REQUEST_PROFILING_TOKEN_MAX_AGE = 3600
+REQUEST_PROFILING_MAX_STORED = 200
+
+# Maximum number of sub-requests accepted by /api/batch
+BATCH_MAX_REQUESTS = 20
@@ -0,0 +1,47 @@
+"""
+Production settings for short-lived API containers.
+
+Trims everything the JSON API does not need at startup: the admin,
+sessions, messages and static files apps, the browsable API and the
+drf-spectacular schema tooling. Select it with
+DJANGO_SETTINGS_MODULE=core.settings_production.
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+DEBUG = False
+
+# Required, comma-separated: an empty list would reject every request with 400
+ALLOWED_HOSTS = [host.strip() for host in os.environ['DJANGO_ALLOWED_HOSTS'].split(',')
+                 if host.strip()]
+if not ALLOWED_HOSTS:
+    raise ImproperlyConfigured('DJANGO_ALLOWED_HOSTS must list at least one host')
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'rest_framework',
+    'api',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'api.profiling.RequestProfilingMiddleware',
+]
+
+TEMPLATES[0]['OPTIONS']['context_processors'] = [
+    'django.template.context_processors.request',
+]
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_PARSER_CLASSES': ['rest_framework.parsers.JSONParser'],
+    'DEFAULT_AUTHENTICATION_CLASSES': ['rest_framework.authentication.BasicAuthentication'],
+}